@@ -2,10 +2,16 @@
 
 This package defines functions and prompt templates used to interact
 with large language models and external media APIs to generate
-high quality affiliate content.  The default implementation uses
-OpenAI’s ChatCompletion API via the `openai` Python library, but you
-can adapt it to use other models or frameworks such as Anthropic or
-LlamaIndex.
+high quality affiliate content.  The default implementation uses
+OpenAI’s async Chat Completions API via the `openai` Python library,
+but you can adapt it to use other models or frameworks such as
+Anthropic or LlamaIndex.
+
+`generate_niche_site` is a coroutine.  Synchronous callers must run it
+in an event loop, e.g. ``asyncio.run(generate_niche_site(slug, keywords))``;
+calling it without awaiting only creates a coroutine object and
+generates nothing.  See `orchestrator.tasks.generate_niche_task` for a
+synchronous wrapper that also closes the OpenAI client afterwards.
 """
 
-from .agent import generate_niche_site  # re reexport convenience
+from .agent import generate_niche_site  # re reexport convenience
@@ -4,72 +4,417 @@ This module exposes functions that coordinate calls to large language
 models and media APIs to produce outlines, full articles and media
 assets.  External services are abstracted into individual helper
 functions so they can be stubbed during development or replaced with
-other providers.  By default, OpenAI’s ChatCompletion API is used for
-text generation; set the `OPENAI_API_KEY` environment variable or
-modify `call_llm` to integrate with another model.
+other providers.  By default, OpenAI’s async Chat Completions API is
+used for text generation; set the `OPENAI_API_KEY` environment variable
+or modify `acall_llm` to integrate with another model.
+
+All LLM helpers are coroutines so that independent sections can be
+generated concurrently.  Synchronous callers should wrap
+`generate_niche_site` in `asyncio.run` and await `aclose_client` before
+that loop ends.
 """
 
 from __future__ import annotations
 
-import json
+import asyncio
+import contextlib
+import functools
 import os
+import random
+import weakref
+from contextvars import ContextVar
 from pathlib import Path
-from typing import Iterable, List, Dict, Any
+from typing import Awaitable, Callable, Iterable, List, Dict, Any, Optional, Tuple
 
+import httpx
 import openai
+import orjson
+
+from . import cache, semcache
 
 
 # Load environment variables (you can also use python‑dotenv)
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if OPENAI_API_KEY:
-    openai.api_key = OPENAI_API_KEY
+
+# Chat model used for every generation step.
+LLM_MODEL = "gpt-4o"
+# Upper bound on concurrent LLM requests.  Tune it to your account's
+# rate limits so fan-out saturates throughput without triggering 429s.
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+# Attempts per request when the API reports a rate limit, a server error or a
+# connection error.  The SDK's own retries are disabled so this is the only
+# retry policy.
+LLM_MAX_ATTEMPTS = 6
+# Size of the HTTP connection pool shared by all LLM requests.  Keep it at
+# or above LLM_MAX_CONCURRENCY so requests never queue for a connection.
+OAI_MAX_CONNECTIONS = int(os.getenv("OAI_MAX_CONN", "64"))
+# Per-request timeout in seconds.  A request that times out is retried
+# once with FALLBACK_MODEL, which is faster, with a tighter token budget.
+LLM_TIMEOUT = 30.0
+# Time allowed to open a new connection, so an unreachable endpoint fails
+# fast instead of consuming the whole request timeout.
+LLM_CONNECT_TIMEOUT = 5.0
+FALLBACK_MODEL = "gpt-4o-mini"
+FALLBACK_MAX_TOKENS = 1200
+# response_format that forces the model to reply with a valid JSON object.
+JSON_OBJECT_FORMAT: Dict[str, Any] = {"type": "json_object"}
+
+# asyncio primitives belong to the event loop they are first used on, and
+# each `asyncio.run` starts a new loop, so the semaphore bounding LLM
+# requests is created per loop rather than at import.
+_max_concurrency = LLM_MAX_CONCURRENCY
+_semaphores: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+# OpenAI clients, one per event loop for the same reason; see _get_client.
+_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+# When set to a list, acall_llm appends the model of every request in the
+# current task that timed out and was answered by FALLBACK_MODEL instead.
+_fallbacks: ContextVar[Optional[List[str]]] = ContextVar("_fallbacks", default=None)
+
+
+def set_max_concurrency(limit: int) -> None:
+    """Change the maximum number of concurrent LLM requests.
+
+    Call this before starting generation; event loops that have already
+    issued requests keep the previous limit.
+
+    Args:
+        limit (int): Maximum number of in-flight requests.
+    """
+    global _max_concurrency
+    if limit < 1:
+        raise ValueError("concurrency limit must be at least 1")
+    _max_concurrency = limit
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    """Return the semaphore bounding LLM requests on the running event loop."""
+    loop = asyncio.get_running_loop()
+    sem = _semaphores.get(loop)
+    if sem is None:
+        sem = _semaphores[loop] = asyncio.Semaphore(_max_concurrency)
+    return sem
+
+
+def _get_client() -> openai.AsyncOpenAI:
+    """Return the async OpenAI client for the running event loop.
+
+    The client is created lazily so that importing this module does not
+    require an API key, and it is reused across calls so that every
+    request shares the same underlying HTTP connection pool.  HTTP/2 lets
+    concurrent requests multiplex over a few kept-alive connections
+    instead of paying a TLS handshake each.  The pool's connections
+    belong to the loop that opened them, so each loop gets its own
+    client; close it with `aclose_client` before the loop ends.
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        http_client = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=OAI_MAX_CONNECTIONS, max_keepalive_connections=32),
+            # Default for requests that do not pass their own timeout, such
+            # as embeddings; chat completions set one per request.
+            timeout=httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+        )
+        # max_retries=0: _with_backoff retries rate limits and server errors
+        # itself and hands timeouts straight to the fallback model.
+        client = _clients[loop] = openai.AsyncOpenAI(api_key=OPENAI_API_KEY, http_client=http_client,
+                                                     max_retries=0)
+    return client
+
+
+async def aclose_client() -> None:
+    """Close the running event loop's OpenAI client, if one was created.
+
+    Await this before the loop ends, e.g. in a `finally` block of the
+    coroutine passed to `asyncio.run`, so its connections are released.
+    """
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
 
 
-def call_llm(system_prompt: str, user_prompt: str, model: str = "gpt-4o") -> str:
+async def acall_llm(system_prompt: str, user_prompt: str, model: str = LLM_MODEL,
+                    temperature: Optional[float] = None,
+                    response_format: Optional[Dict[str, Any]] = None,
+                    max_tokens: Optional[int] = None,
+                    timeout: float = LLM_TIMEOUT,
+                    on_chunk: Optional[Callable[[str], Any]] = None) -> str:
     """Call a chat model with a system and user prompt and return the response.
 
+    Requests are bounded by a per-event-loop semaphore and retried with
+    exponential backoff when the API is rate limited or unreachable.
+    Calls that explicitly request ``temperature=0`` are served from the
+    on-disk response cache when an identical request has been made
+    recently; other calls always reach the API, so regenerating a niche
+    produces fresh copy.  If the request times out it is retried once
+    with `FALLBACK_MODEL`, trading quality for a result.
+
+    When `on_chunk` is given the reply is streamed and each fragment is
+    passed to it as it arrives, e.g. to show progress; the complete reply
+    is still returned.  The timeout then bounds the wait for each
+    fragment rather than the whole reply.  A cached reply is passed as a
+    single fragment, and a reply retried with `FALLBACK_MODEL` is
+    streamed again from the start.
+
     Args:
         system_prompt (str): The system prompt that sets the context and tone.
         user_prompt (str): The user’s instruction or input message.
         model (str, optional): The model name. Defaults to "gpt-4o".
+        temperature (float, optional): Sampling temperature. Defaults to
+            None, which leaves it to the API's default.
+        response_format (dict, optional): Passed through to the API, e.g.
+            ``{"type": "json_object"}`` to force a JSON reply.
+        max_tokens (int, optional): Upper bound on the reply length.
+        timeout (float, optional): Request timeout in seconds; connecting is
+            limited to `LLM_CONNECT_TIMEOUT` either way. Defaults to 30.
+        on_chunk (callable, optional): Called with each fragment of a
+            streamed reply.
 
     Returns:
         str: The assistant’s reply content.
     """
-    response = openai.ChatCompletion.create(
+    key = None
+    if temperature == 0:
+        key = cache.make_key(model, system_prompt, user_prompt, temperature)
+        cached = cache.get(key)
+        if cached is not None:
+            if on_chunk is not None:
+                on_chunk(cached)
+            return cached
+
+    # A per-request timeout replaces the client's, so keep the short
+    # connect timeout here as well
+    extra: Dict[str, Any] = {"timeout": httpx.Timeout(timeout, connect=LLM_CONNECT_TIMEOUT)}
+    if temperature is not None:
+        extra["temperature"] = temperature
+    if response_format is not None:
+        extra["response_format"] = response_format
+    if max_tokens is not None:
+        extra["max_tokens"] = max_tokens
+
+    try:
+        async with _get_semaphore():
+            if on_chunk is None:
+                response = await _create_completion(system_prompt, user_prompt, model, **extra)
+                result = response.choices[0].message.content.strip()
+            else:
+                result = await _stream_completion(system_prompt, user_prompt, model,
+                                                  on_chunk, **extra)
+    except openai.APITimeoutError:
+        if model == FALLBACK_MODEL:
+            raise
+        recorded = _fallbacks.get()
+        if recorded is not None:
+            recorded.append(model)
+        return await acall_llm(system_prompt, user_prompt, FALLBACK_MODEL, temperature,
+                               response_format=response_format,
+                               max_tokens=FALLBACK_MAX_TOKENS, timeout=timeout,
+                               on_chunk=on_chunk)
+    # SQLite commits run in a worker thread so they do not stall the
+    # event loop
+    if key is not None:
+        await asyncio.to_thread(cache.set, key, result)
+    return result
+
+
+async def _semantic_lookup(scope: str, text: str) -> Tuple[Optional[Any], Optional[str]]:
+    """Embed `text` and look it up in the semantic cache.
+
+    The cache is an optimization, so any failure (a timed-out embedding
+    request, a corrupt cache file, ...) is treated as a miss rather than
+    failing the generation.
+
+    Returns:
+        tuple: The embedding, or None if it could not be computed, and the
+        cached response, or None on a miss.
+    """
+    try:
+        client = _get_client()
+        async with _get_semaphore():
+            embedding = await _with_backoff(lambda: semcache.aembed(client, text))
+    except Exception:
+        return None, None
+    try:
+        # SQLite and memmap reads run in a worker thread
+        return embedding, await asyncio.to_thread(semcache.lookup, scope, embedding)
+    except Exception:
+        return embedding, None
+
+
+async def _semantic_store(scope: str, embedding: Any, response: str) -> None:
+    """Add a response to the semantic cache, ignoring any failure."""
+    with contextlib.suppress(Exception):
+        await asyncio.to_thread(semcache.add, scope, embedding, response)
+
+
+async def _create_completion(system_prompt: str, user_prompt: str, model: str,
+                             **kwargs: Any) -> Any:
+    """Create a chat completion, backing off on rate limits and transient errors.
+
+    Timeouts are raised after the first attempt (the client is built with
+    ``max_retries=0``) so that callers can fall back to a faster model
+    instead of waiting on the same one again.
+    """
+    client = _get_client()
+    return await _with_backoff(lambda: client.chat.completions.create(
         model=model,
         messages=[
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt},
         ],
-    )
-    return response["choices"][0]["message"]["content"].strip()
+        **kwargs,
+    ))
+
 
+async def _stream_completion(system_prompt: str, user_prompt: str, model: str,
+                             on_chunk: Callable[[str], Any], **kwargs: Any) -> str:
+    """Stream a chat completion into `on_chunk` and return the full reply.
 
+    Retries only cover opening the stream.  The stream is closed even if
+    reading it fails, so its connection returns to the pool.
+    """
+    stream = await _create_completion(system_prompt, user_prompt, model, stream=True, **kwargs)
+    parts: List[str] = []
+    async with stream:
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                parts.append(delta)
+                on_chunk(delta)
+    return "".join(parts).strip()
+
+
+async def _with_backoff(request: Callable[[], Awaitable[Any]]) -> Any:
+    """Await `request()`, retrying with exponential backoff on rate limits,
+    5xx server errors and connection errors.  Timeouts are raised
+    immediately."""
+    for attempt in range(LLM_MAX_ATTEMPTS):
+        try:
+            return await request()
+        except openai.APITimeoutError:
+            raise
+        except (openai.RateLimitError, openai.InternalServerError, openai.APIConnectionError):
+            if attempt == LLM_MAX_ATTEMPTS - 1:
+                raise
+            await asyncio.sleep(min(60, 2 ** attempt + random.random()))
+
+
+@functools.lru_cache(maxsize=16)
 def load_prompt(name: str) -> str:
-    """Load a prompt template from the `prompts` directory."""
+    """Load a prompt template from the `prompts` directory.
+
+    Templates are read from disk once per process and memoized.
+    """
     prompts_dir = Path(__file__).resolve().parent / "prompts"
     with open(prompts_dir / name, "r", encoding="utf-8") as f:
         return f.read()
 
 
-def generate_outline(slug: str, keywords: Iterable[str]) -> Dict[str, Any]:
+# Read the templates used by generate_niche_site once at import so the
+# first generation calls do not hit the disk.
+for _name in ("outline_prompt.txt", "section_polished_prompt.txt"):
+    load_prompt(_name)
+del _name
+
+
+async def agenerate_outline(slug: str, keywords: Iterable[str],
+                            temperature: Optional[float] = None) -> Dict[str, Any]:
     """Generate a structured outline for the given niche.
 
+    With ``SEMCACHE=1``, deterministic (``temperature=0``) outlines are
+    also reused across niches whose prompts are nearly identical, e.g.
+    niches with overlapping keywords.  Only outlines that the model
+    answered with valid JSON on its first try are shared this way.
+
     Args:
         slug (str): Niche slug for naming purposes.
         keywords (Iterable[str]): Seed keywords.
+        temperature (float, optional): Sampling temperature; pass 0 to
+            make the step deterministic and cacheable. Defaults to the
+            API's default.
 
     Returns:
         dict: A dictionary with keys `sections`, `faqs` and `products`.
     """
-    system_prompt = "You are an expert content strategist."
-    outline_prompt = load_prompt("outline_prompt.txt")
+    system_prompt, user_prompt = outline_prompts(slug, keywords)
+    embedding = None
+    if temperature == 0 and semcache.ENABLED:
+        # Scope similarity matches to the same model and system prompt
+        scope = cache.make_key(LLM_MODEL, system_prompt, "", temperature)
+        embedding, similar = await _semantic_lookup(scope, user_prompt)
+        if similar is not None:
+            return orjson.loads(similar)
+
+    # Track timeouts locally so a degraded outline is never shared, then
+    # report them to the caller's list as usual
+    outer = _fallbacks.get()
+    degraded: List[str] = []
+    token = _fallbacks.set(degraded)
+    try:
+        response = await acall_llm(system_prompt, user_prompt, LLM_MODEL, temperature,
+                                   response_format=JSON_OBJECT_FORMAT)
+        try:
+            outline = orjson.loads(response)
+        except orjson.JSONDecodeError:
+            return await arepair_outline(response, temperature)
+    finally:
+        _fallbacks.reset(token)
+        if outer is not None:
+            outer.extend(degraded)
+    if embedding is not None and not degraded and isinstance(outline, dict):
+        await _semantic_store(scope, embedding, response)
+    return outline
+
+
+async def arepair_outline(response: str, temperature: Optional[float] = None) -> Dict[str, Any]:
+    """Ask the model to fix an outline reply that is not valid JSON.
+
+    The repair is attempted once; if its reply is still invalid, the
+    fallback outline of `parse_outline` is returned.
+
+    Args:
+        response (str): The invalid outline reply.
+        temperature (float, optional): Sampling temperature. Defaults to
+            the API's default.
+
+    Returns:
+        dict: The decoded outline.
+    """
+    response = await acall_llm(
+        "Return ONLY the JSON object contained in the user's text, fixing any syntax errors.",
+        response,
+        temperature=temperature,
+        response_format=JSON_OBJECT_FORMAT,
+    )
+    return parse_outline(response)
+
+
+def outline_prompts(slug: str, keywords: Iterable[str]) -> Tuple[str, str]:
+    """Build the system and user prompts for the outline step.
+
+    Shared by `agenerate_outline` and the Batch API path, so both send
+    identical requests and share cache entries.
+    """
+    # Static instructions go in the system message so the prompt prefix is
+    # identical across calls and eligible for OpenAI's prompt caching.
+    system_prompt = "You are an expert content strategist.\n\n" + load_prompt("outline_prompt.txt")
     user_content = f"niche: {slug}\nkeywords: {', '.join(keywords)}"
-    response = call_llm(system_prompt, outline_prompt + "\n\n" + user_content)
+    return system_prompt, user_content
+
+
+def parse_outline(response: str) -> Dict[str, Any]:
+    """Decode the outline JSON returned by the model.
+
+    Returns a minimal single-section outline if `response` is not valid
+    JSON; use `arepair_outline` first to give the model a chance to fix it.
+    """
     try:
-        return json.loads(response)
-    except json.JSONDecodeError:
+        return orjson.loads(response)
+    except orjson.JSONDecodeError:
         # If the model fails to return valid JSON, fall back to a simple outline
         return {
             "sections": [{"title": "Introduction", "subsections": []}],
@@ -78,51 +423,124 @@ def generate_outline(slug: str, keywords: Iterable[str]) -> Dict[str, Any]:
         }
 
 
-def generate_section(section: Dict[str, Any], products: List[str]) -> str:
+async def agenerate_section(section: Dict[str, Any], products: List[str],
+                            temperature: Optional[float] = None,
+                            on_chunk: Optional[Callable[[str], Any]] = None) -> str:
     """Generate prose for a single outline section.
 
+    Part of the public API for callers that want to draft and polish in
+    separate steps; `generate_niche_site` uses the fused
+    `agenerate_polished_section` instead.
+
     Args:
         section (dict): A section dict with a title and optional bullet points.
         products (list[str]): Product identifiers to mention.
+        temperature (float, optional): Sampling temperature; pass 0 to
+            make the step deterministic and cacheable. Defaults to the
+            API's default.
+        on_chunk (callable, optional): If given, the reply is streamed and
+            each fragment is passed to this callback as it arrives.
 
     Returns:
         str: Markdown content for the section.
     """
-    system_prompt = "You are a helpful writer producing affiliate content."
-    section_prompt = load_prompt("section_prompt.txt")
-    # Compose a structured user message
-    bullet_points = section.get("bullet_points", [])
-    user_content = json.dumps({
+    system_prompt = ("You are a helpful writer producing affiliate content.\n\n"
+                     + load_prompt("section_prompt.txt"))
+    # Only the per-section data varies between calls
+    user_content = _section_payload(section, products)
+    return await acall_llm(system_prompt, user_content, temperature=temperature,
+                           on_chunk=on_chunk)
+
+
+async def agenerate_polished_section(section: Dict[str, Any], products: List[str],
+                                     temperature: Optional[float] = None,
+                                     on_chunk: Optional[Callable[[str], Any]] = None) -> str:
+    """Generate polished prose for a single outline section in one LLM call.
+
+    This fuses `agenerate_section` and `apolish_copy` into a single
+    request, halving the round-trips and prompt tokens spent per section.
+
+    Args:
+        section (dict): A section dict with a title and optional bullet points.
+        products (list[str]): Product identifiers to mention.
+        temperature (float, optional): Sampling temperature; pass 0 to
+            make the step deterministic and cacheable. Defaults to the
+            API's default.
+        on_chunk (callable, optional): If given, the reply is streamed and
+            each fragment is passed to this callback as it arrives.
+
+    Returns:
+        str: Polished Markdown content for the section.
+    """
+    response = await acall_llm(
+        *polished_section_prompts(section, products),
+        temperature=temperature,
+        response_format=JSON_OBJECT_FORMAT,
+        on_chunk=on_chunk,
+    )
+    return parse_polished_section(response)
+
+
+def polished_section_prompts(section: Dict[str, Any], products: List[str]) -> Tuple[str, str]:
+    """Build the system and user prompts for the fused section step.
+
+    Shared by `agenerate_polished_section` and the Batch API path.
+    """
+    system_prompt = ("You are a helpful writer and editor producing affiliate content.\n\n"
+                     + load_prompt("section_polished_prompt.txt"))
+    return system_prompt, _section_payload(section, products)
+
+
+def parse_polished_section(response: str) -> str:
+    """Extract the Markdown from the fused section step's JSON reply."""
+    try:
+        return orjson.loads(response)["markdown"]
+    except (orjson.JSONDecodeError, KeyError, TypeError):
+        # JSON mode should prevent this, but keep whatever text we received
+        return response
+
+
+def _section_payload(section: Dict[str, Any], products: List[str]) -> str:
+    """Serialize the per-section data sent as the user message."""
+    return orjson.dumps({
         "title": section["title"],
-        "bullet_points": bullet_points,
+        "bullet_points": section.get("bullet_points", []),
         "products": products,
-    }, indent=2)
-    response = call_llm(system_prompt, section_prompt + "\n\n" + user_content)
-    return response
+    }, option=orjson.OPT_INDENT_2).decode()
 
 
-def polish_copy(draft: str) -> str:
+async def apolish_copy(draft: str, temperature: Optional[float] = None) -> str:
     """Run the Grammarly/Spacy polishing step via the LLM.
 
+    Part of the public API, to be used with `agenerate_section`;
+    `generate_niche_site` polishes sections as it writes them.
+
     Args:
         draft (str): The unpolished Markdown text.
+        temperature (float, optional): Sampling temperature; pass 0 to
+            make the step deterministic and cacheable. Defaults to the
+            API's default.
 
     Returns:
         str: Polished Markdown with improved tone and citation placeholders.
     """
-    system_prompt = "You are an editor improving AI‑generated prose."
-    polish_prompt = load_prompt("polish_prompt.txt")
-    response = call_llm(system_prompt, polish_prompt + "\n\n" + draft)
+    system_prompt = ("You are an editor improving AI‑generated prose.\n\n"
+                     + load_prompt("polish_prompt.txt"))
+    response = await acall_llm(system_prompt, draft, temperature=temperature)
     return response
 
 
-def fetch_images(keywords: Iterable[str], count: int = 3) -> List[str]:
+async def afetch_images(keywords: Iterable[str], count: int = 3) -> List[str]:
     """Fetch royalty‑free images matching the given keywords.
 
-    The default implementation returns placeholder filenames.  You can
-    integrate the Unsplash API or OpenAI’s image models here.  If you
-    choose to use an API, remember to respect license terms and store
-    proof of provenance as suggested by the reference design.
+    No image provider is configured yet, so the default implementation
+    returns an empty list.  You can integrate the Unsplash API or
+    OpenAI’s image models here.  If you choose to use an API, remember to
+    respect license terms and store proof of provenance as suggested by
+    the reference design.  Every returned filename is linked from the
+    article, so only return images that have actually been saved to the
+    site directory.  This is a coroutine so that image requests can run
+    while the text is being generated.
 
     Args:
         keywords (Iterable[str]): Keywords to search for images.
@@ -131,49 +549,201 @@ def fetch_images(keywords: Iterable[str], count: int = 3) -> List[str]:
     Returns:
         list[str]: List of local image filenames.
     """
-    # Placeholder implementation: return generic file names
-    return [f"image_{i + 1}.jpg" for i in range(count)]
+    # Placeholder implementation: linking made-up filenames would publish
+    # broken images, so return none until a provider is integrated
+    return []
 
 
-def generate_niche_site(slug: str, keywords: Iterable[str]) -> None:
+async def generate_niche_site(slug: str, keywords: Iterable[str],
+                              temperature: Optional[float] = None,
+                              on_chunk: Optional[Callable[[str], Any]] = None) -> None:
     """Generate a new niche site by orchestrating outline, section and polish steps.
 
-    This function creates a directory under `sites/<slug>` and writes an
-    `index.md` file containing the article.  In a real implementation
-    you would create multiple pages, copy the Astro template and
-    write JSON‑LD metadata.  For demonstration purposes we assemble
-    a single Markdown file.
+    Each section is written and polished in a single LLM call, and all
+    sections are generated concurrently, so the wall-clock cost of a site
+    is roughly that of its slowest section rather than the sum of all of
+    them.  Images are fetched in the background at the same time.
+    Sections are appended to `sites/<slug>/index.md.tmp` as soon as they
+    and every section before them are ready, so finished drafts do not
+    stay in memory waiting for the slowest one; the file is renamed to
+    `index.md` once the article is complete.  If any section fails, the
+    others are cancelled and no `index.md` is written.  Steps that timed
+    out and were answered by `FALLBACK_MODEL` are listed in
+    `sites/<slug>/metadata.json` so they can be regenerated later.  In a
+    real implementation you would create multiple pages, copy the Astro
+    template and write JSON‑LD metadata.  For demonstration purposes we
+    assemble a single Markdown file.
+
+    Args:
+        slug (str): Niche slug; it is stripped and lowercased.
+        keywords (Iterable[str]): Seed keywords.
+        temperature (float, optional): Sampling temperature for every
+            step.  Pass 0 for deterministic output that is served from
+            the response cache when the niche is regenerated unchanged.
+            Defaults to the API's default.
+        on_chunk (callable, optional): If given, section replies are
+            streamed and every fragment is passed to this callback as it
+            arrives, e.g. to show progress.  Fragments of concurrent
+            sections interleave, and the polished sections reply in
+            JSON, so use them to measure progress rather than to display
+            the text.
     """
     slug = slug.strip().lower()
+    keywords = list(keywords)
+    images_task = asyncio.create_task(afetch_images(keywords))
+    try:
+        outline_fallbacks: List[str] = []
+        token = _fallbacks.set(outline_fallbacks)
+        try:
+            outline = await agenerate_outline(slug, keywords, temperature)
+        finally:
+            _fallbacks.reset(token)
+        sections = outline.get("sections", [])
+        faqs = outline.get("faqs", [])
+        products = outline.get("products", [])
+
+        site_dir = _site_dir(slug)
+        finished: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        degraded: Dict[int, str] = {}
+
+        async def _build(index: int, section: Dict[str, Any]) -> None:
+            # Each _build runs in its own task, so this setting is task-local
+            section_fallbacks: List[str] = []
+            _fallbacks.set(section_fallbacks)
+            polished = await agenerate_polished_section(section, products, temperature, on_chunk)
+            if section_fallbacks:
+                degraded[index] = section["title"]
+            await finished.put((index, render_section(section, polished)))
+
+        async def _writer(f) -> None:
+            # Hold out-of-order sections until the contiguous prefix is complete
+            buffered: Dict[int, str] = {}
+            next_index = 0
+            while next_index < len(sections):
+                index, part = await finished.get()
+                buffered[index] = part
+                ready: List[str] = []
+                while next_index in buffered:
+                    ready.append(buffered.pop(next_index) + "\n")
+                    next_index += 1
+                if ready:
+                    await asyncio.to_thread(_append, f, "".join(ready))
+
+        # Disk writes run in a worker thread so a slow filesystem does not
+        # stall the event loop that other sections and niches share.  The
+        # article is written to a temporary file that replaces index.md
+        # only once it is complete, so a failed run leaves any previous
+        # version intact.
+        tmp_path = site_dir / "index.md.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                await asyncio.to_thread(_append, f, _render_title(slug))
+                # If any section fails, the group cancels the remaining ones
+                try:
+                    async with asyncio.TaskGroup() as tg:
+                        tg.create_task(_writer(f))
+                        for i, section in enumerate(sections):
+                            tg.create_task(_build(i, section))
+                except ExceptionGroup as eg:
+                    # Report the failing section's error, not the group
+                    raise eg.exceptions[0] from eg
+                tail = _render_images(await images_task, keywords) + _render_faqs(faqs)
+                await asyncio.to_thread(_append, f, tail)
+            _publish_index(tmp_path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+        metadata = {
+            "fallback_model": FALLBACK_MODEL,
+            "degraded_outline": bool(outline_fallbacks),
+            "degraded_sections": [degraded[i] for i in sorted(degraded)],
+        }
+        await asyncio.to_thread(
+            (site_dir / "metadata.json").write_bytes,
+            orjson.dumps(metadata, option=orjson.OPT_INDENT_2),
+        )
+    finally:
+        images_task.cancel()
+
+    print(f"Generated content for niche '{slug}' in {site_dir}")
+
+
+def _append(f, text: str) -> None:
+    """Write `text` to an open file and flush it to the OS."""
+    f.write(text)
+    f.flush()
+
+
+def _publish_index(tmp_path: Path) -> None:
+    """Atomically move a completed `index.md.tmp` over `index.md`."""
+    os.replace(tmp_path, tmp_path.with_name("index.md"))
+
+
+def _site_dir(slug: str) -> Path:
+    """Return `sites/<slug>`, creating it if necessary."""
     site_dir = Path(__file__).resolve().parents[1] / "sites" / slug
     site_dir.mkdir(parents=True, exist_ok=True)
+    return site_dir
+
+
+def _render_title(slug: str) -> str:
+    """Format the article's H1 heading."""
+    title = slug.replace("-", " ").title()
+    return f"# {title}\n\n"
 
-    outline = generate_outline(slug, keywords)
-    sections = outline.get("sections", [])
-    faqs = outline.get("faqs", [])
-    products = outline.get("products", [])
 
-    # Generate content for each section
-    article_parts: List[str] = []
-    for section in sections:
-        # The LLM may not return bullet points; default to using the title as a bullet
-        content = generate_section(section, products)
-        polished = polish_copy(content)
-        article_parts.append(f"## {section['title']}\n\n" + polished.strip() + "\n")
+def render_section(section: Dict[str, Any], polished: str) -> str:
+    """Format a generated section as a Markdown block with its heading."""
+    return f"## {section['title']}\n\n" + polished.strip() + "\n"
 
-    # Assemble FAQs
+
+def _render_images(images: List[str], keywords: List[str]) -> str:
+    """Format images as Markdown, using the seed keywords as alt text."""
+    return "".join(
+        f"![{keywords[i % len(keywords)] if keywords else ''}]({name})\n\n"
+        for i, name in enumerate(images)
+    )
+
+
+def _render_faqs(faqs: List[str]) -> str:
+    """Format the FAQ block that closes the article."""
     faq_md = ""
     if faqs:
         faq_md += "\n## Frequently Asked Questions\n\n"
         for q in faqs:
             faq_md += f"**{q}**\n\n" + "[Answer pending]\n\n"
+    return faq_md
+
+
+def write_site(slug: str, article_parts: List[str], faqs: List[str],
+               images: List[str], keywords: List[str]) -> Path:
+    """Write an already assembled article to `sites/<slug>/index.md`.
 
-    # Write the Markdown file
-    with open(site_dir / "index.md", "w", encoding="utf-8") as f:
-        title = slug.replace("-", " ").title()
-        f.write(f"# {title}\n\n")
-        for part in article_parts:
-            f.write(part + "\n")
-        f.write(faq_md)
+    Used by the Batch API path, which receives every section at once.
+    Like `generate_niche_site`, it writes to `index.md.tmp` and renames
+    the file over `index.md` only once it is complete.
 
-    print(f"Generated content for niche '{slug}' in {site_dir}")
\ No newline at end of file
+    Args:
+        slug (str): Normalized niche slug.
+        article_parts (list[str]): Rendered section blocks, in order.
+        faqs (list[str]): FAQ questions from the outline.
+        images (list[str]): Image filenames to embed.
+        keywords (list[str]): Seed keywords, used as image alt text.
+
+    Returns:
+        Path: The site directory.
+    """
+    site_dir = _site_dir(slug)
+    buf = [
+        _render_title(slug),
+        *(part + "\n" for part in article_parts),
+        _render_images(images, keywords),
+        _render_faqs(faqs),
+    ]
+    tmp_path = site_dir / "index.md.tmp"
+    try:
+        tmp_path.write_text("".join(buf), encoding="utf-8")
+        _publish_index(tmp_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    return site_dir
@@ -0,0 +1,263 @@
+"""Offline niche generation through the OpenAI Batch API.
+
+Bulk jobs such as nightly refreshes do not need real-time answers.  The
+Batch API accepts a JSONL file of chat completion requests, processes
+them within a 24 hour window and bills them at half the regular price.
+This module builds those request files from the same prompts used by
+`content_agent.agent`, waits for the results and writes the sites.
+
+Generation runs in two rounds: one batch for the outlines of every
+niche, then one batch for all of their sections.  Outlines that come
+back as invalid JSON are repaired with a real-time request, as in
+`agent.agenerate_outline`.  When run with ``temperature=0``, responses
+are stored in the shared response cache, so an interrupted run can be
+resumed without paying for completed requests twice.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import openai
+import orjson
+
+from . import agent, cache
+
+COMPLETION_WINDOW = "24h"
+# Polling starts at POLL_INITIAL_DELAY seconds and doubles up to POLL_MAX_DELAY.
+POLL_INITIAL_DELAY = 10.0
+POLL_MAX_DELAY = 600.0
+
+_TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+@functools.lru_cache(maxsize=1)
+def _get_client() -> openai.OpenAI:
+    """Return the shared synchronous OpenAI client used for batch jobs."""
+    return openai.OpenAI(api_key=agent.OPENAI_API_KEY)
+
+
+def build_request(custom_id: str, system_prompt: str, user_prompt: str,
+                  model: str = "gpt-4o", temperature: Optional[float] = None,
+                  response_format: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Build one line of a Batch API input file.
+
+    Args:
+        custom_id (str): Identifier used to match the response to the request.
+        system_prompt (str): The system prompt.
+        user_prompt (str): The user prompt.
+        model (str, optional): The model name. Defaults to "gpt-4o".
+        temperature (float, optional): Sampling temperature. Defaults to
+            None, which leaves it to the API's default.
+        response_format (dict, optional): Response format passed to the API.
+
+    Returns:
+        dict: The request record.
+    """
+    body: Dict[str, Any] = {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ],
+    }
+    if temperature is not None:
+        body["temperature"] = temperature
+    if response_format is not None:
+        body["response_format"] = response_format
+    return {"custom_id": custom_id, "method": "POST", "url": "/v1/chat/completions", "body": body}
+
+
+def submit_batch(requests: List[Dict[str, Any]]) -> str:
+    """Upload request records and start a batch job.
+
+    Args:
+        requests (list[dict]): Records created with `build_request`.
+
+    Returns:
+        str: The batch identifier.
+    """
+    client = _get_client()
+    payload = b"\n".join(orjson.dumps(r) for r in requests)
+    input_file = client.files.create(file=("batch.jsonl", payload), purpose="batch")
+    batch = client.batches.create(
+        input_file_id=input_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window=COMPLETION_WINDOW,
+    )
+    return batch.id
+
+
+def poll_batch(batch_id: str, initial_delay: float = POLL_INITIAL_DELAY,
+               max_delay: float = POLL_MAX_DELAY) -> Any:
+    """Block until a batch job reaches a terminal state.
+
+    The delay between status checks doubles after each check, up to
+    `max_delay` seconds.
+
+    Args:
+        batch_id (str): The batch identifier.
+        initial_delay (float, optional): First delay in seconds.
+        max_delay (float, optional): Maximum delay in seconds.
+
+    Returns:
+        Batch: The final batch object.
+    """
+    client = _get_client()
+    delay = initial_delay
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        if batch.status in _TERMINAL_STATUSES:
+            return batch
+        time.sleep(delay)
+        delay = min(max_delay, delay * 2)
+
+
+def fetch_results(batch: Any) -> Dict[str, str]:
+    """Download the replies of a completed batch job.
+
+    Requests that failed individually are omitted from the result.
+
+    Args:
+        batch (Batch): A batch object returned by `poll_batch`.
+
+    Returns:
+        dict[str, str]: Assistant replies keyed by custom id.
+
+    Raises:
+        RuntimeError: If the batch did not complete.
+    """
+    if batch.status != "completed":
+        raise RuntimeError(f"Batch {batch.id} ended with status '{batch.status}'")
+    results: Dict[str, str] = {}
+    if not batch.output_file_id:
+        return results
+    output = _get_client().files.content(batch.output_file_id).text
+    for line in output.splitlines():
+        if not line.strip():
+            continue
+        record = orjson.loads(line)
+        response = record.get("response") or {}
+        if response.get("status_code") != 200:
+            continue
+        body = response["body"]
+        results[record["custom_id"]] = body["choices"][0]["message"]["content"].strip()
+    return results
+
+
+def _complete_all(prompts: Dict[str, Tuple[str, str]], model: str,
+                  temperature: Optional[float] = None,
+                  response_format: Optional[Dict[str, Any]] = None) -> Dict[str, str]:
+    """Answer a set of prompts, submitting only cache misses as a batch.
+
+    As in `agent.acall_llm`, only ``temperature=0`` requests use the cache.
+    """
+    use_cache = temperature == 0
+    results: Dict[str, str] = {}
+    requests: List[Dict[str, Any]] = []
+    for custom_id, (system_prompt, user_prompt) in prompts.items():
+        cached = None
+        if use_cache:
+            cached = cache.get(cache.make_key(model, system_prompt, user_prompt, temperature))
+        if cached is not None:
+            results[custom_id] = cached
+        else:
+            requests.append(build_request(custom_id, system_prompt, user_prompt, model,
+                                          temperature, response_format=response_format))
+    if requests:
+        batch = poll_batch(submit_batch(requests))
+        for custom_id, reply in fetch_results(batch).items():
+            if use_cache:
+                cache.set(cache.make_key(model, *prompts[custom_id], temperature), reply)
+            results[custom_id] = reply
+    return results
+
+
+async def _repair_outlines(replies: Dict[str, str],
+                           temperature: Optional[float]) -> Dict[str, Dict[str, Any]]:
+    """Repair invalid outline replies with real-time requests.
+
+    Niches whose repair request fails are omitted from the result.
+    """
+    try:
+        repaired = await asyncio.gather(
+            *(agent.arepair_outline(reply, temperature) for reply in replies.values()),
+            return_exceptions=True,
+        )
+    finally:
+        await agent.aclose_client()
+    return {
+        slug: outline for slug, outline in zip(replies, repaired)
+        if not isinstance(outline, BaseException)
+    }
+
+
+def generate_niche_sites_batch(niches: Iterable[Tuple[str, Iterable[str]]],
+                               model: str = "gpt-4o",
+                               temperature: Optional[float] = None) -> List[str]:
+    """Generate several niche sites through the Batch API.
+
+    This blocks until both rounds of batch jobs have finished, which can
+    take up to twice the completion window.
+
+    Args:
+        niches (Iterable[tuple]): `(slug, keywords)` pairs.
+        model (str, optional): The model name. Defaults to "gpt-4o".
+        temperature (float, optional): Sampling temperature; pass 0 to
+            cache responses so an interrupted run can be resumed.
+            Defaults to the API's default.
+
+    Returns:
+        list[str]: Normalized slugs of the sites that were written.  A
+        niche is missing from the list if any of its requests failed.
+    """
+    niches = [(slug.strip().lower(), list(keywords)) for slug, keywords in niches]
+    keywords_by_slug = dict(niches)
+
+    outline_replies = _complete_all(
+        {f"{slug}:outline": agent.outline_prompts(slug, keywords) for slug, keywords in niches},
+        model,
+        temperature,
+        response_format=agent.JSON_OBJECT_FORMAT,
+    )
+    outlines: Dict[str, Dict[str, Any]] = {}
+    invalid: Dict[str, str] = {}
+    for slug, _ in niches:
+        reply = outline_replies.get(f"{slug}:outline")
+        if reply is None:
+            continue
+        try:
+            outlines[slug] = orjson.loads(reply)
+        except orjson.JSONDecodeError:
+            invalid[slug] = reply
+    if invalid:
+        # Rare enough that a real-time repair beats another batch round
+        outlines.update(asyncio.run(_repair_outlines(invalid, temperature)))
+
+    section_prompts: Dict[str, Tuple[str, str]] = {}
+    for slug, outline in outlines.items():
+        products = outline.get("products", [])
+        for i, section in enumerate(outline.get("sections", [])):
+            section_prompts[f"{slug}:section:{i}"] = agent.polished_section_prompts(section, products)
+    section_replies = _complete_all(section_prompts, model, temperature,
+                                    response_format=agent.JSON_OBJECT_FORMAT)
+
+    written: List[str] = []
+    for slug, outline in outlines.items():
+        sections = outline.get("sections", [])
+        ids = [f"{slug}:section:{i}" for i in range(len(sections))]
+        if any(custom_id not in section_replies for custom_id in ids):
+            continue
+        article_parts = [
+            agent.render_section(section, agent.parse_polished_section(section_replies[custom_id]))
+            for section, custom_id in zip(sections, ids)
+        ]
+        images = asyncio.run(agent.afetch_images(keywords_by_slug[slug]))
+        site_dir = agent.write_site(slug, article_parts, outline.get("faqs", []),
+                                     images, keywords_by_slug[slug])
+        print(f"Generated content for niche '{slug}' in {site_dir}")
+        written.append(slug)
+    return written
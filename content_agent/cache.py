@@ -0,0 +1,109 @@
+"""Content-addressed on-disk cache for LLM responses.
+
+Outline, section and polish prompts are frequently re-issued unchanged
+while iterating on a niche.  This module stores each response in a small
+SQLite table keyed by a hash of everything that determines the output
+(model, prompts and sampling temperature), so repeated runs can skip the
+API round-trip entirely.  Only requests made with an explicit
+temperature of 0 are cached, and entries expire after `CACHE_TTL`
+seconds so that scheduled refreshes eventually see new output:
+
+```
+CREATE TABLE responses (
+  key TEXT PRIMARY KEY,  -- sha256 of the request parameters
+  value TEXT,
+  ts INTEGER             -- unix time the entry was written
+);
+```
+
+Set `LLM_CACHE_PATH` to relocate the database, `LLM_CACHE_TTL` to change
+how long entries are served (0 keeps them forever), or `LLM_CACHE=0` to
+disable caching altogether.
+"""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+import orjson
+
+# Path to the cache database.  By default it lives alongside this module.
+CACHE_PATH = Path(os.getenv("LLM_CACHE_PATH", Path(__file__).resolve().parent / "llm_cache.db"))
+CACHE_ENABLED = os.getenv("LLM_CACHE", "1") != "0"
+# Age in seconds after which an entry is ignored.  Defaults to one week.
+CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+
+# Hit/miss counters for the current process.
+stats: Dict[str, int] = {"hits": 0, "misses": 0}
+
+
+@functools.lru_cache(maxsize=1)
+def _get_connection() -> sqlite3.Connection:
+    """Open the cache database and create the table on first use."""
+    conn = sqlite3.connect(CACHE_PATH, check_same_thread=False)
+    with conn:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value TEXT,
+                ts INTEGER
+            )
+            """
+        )
+    return conn
+
+
+def make_key(model: str, system_prompt: str, user_prompt: str,
+             temperature: Optional[float]) -> str:
+    """Compute the cache key for a chat completion request.
+
+    Args:
+        model (str): The model name.
+        system_prompt (str): The system prompt.
+        user_prompt (str): The user prompt.
+        temperature (float | None): The sampling temperature.
+
+    Returns:
+        str: A hex-encoded SHA-256 digest of the request parameters.
+    """
+    payload = orjson.dumps(
+        {"model": model, "system": system_prompt, "user": user_prompt, "temperature": temperature},
+        option=orjson.OPT_SORT_KEYS,
+    )
+    return hashlib.sha256(payload).hexdigest()
+
+
+def get(key: str) -> Optional[str]:
+    """Return the cached response for `key`, or None on a miss.
+
+    Entries older than `CACHE_TTL` seconds count as misses.
+    """
+    if not CACHE_ENABLED:
+        return None
+    row = _get_connection().execute(
+        "SELECT value, ts FROM responses WHERE key = ?", (key,)
+    ).fetchone()
+    if row is None or (CACHE_TTL and row[1] < time.time() - CACHE_TTL):
+        stats["misses"] += 1
+        return None
+    stats["hits"] += 1
+    return row[0]
+
+
+def set(key: str, value: str) -> None:
+    """Store `value` under `key`, replacing any previous entry."""
+    if not CACHE_ENABLED:
+        return
+    conn = _get_connection()
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO responses (key, value, ts) VALUES (?, ?, ?)",
+            (key, value, int(time.time())),
+        )
@@ -0,0 +1,156 @@
+"""Embedding-based cache for near-duplicate LLM prompts.
+
+The exact-match cache in `content_agent.cache` only helps when a prompt
+is byte-for-byte identical to an earlier one.  Niches with overlapping
+keyword sets ("running shoes" vs "jogging shoes") produce outline
+prompts that differ slightly but deserve the same answer.  This module
+embeds each user prompt and returns a stored response when a previous
+prompt sent with the same model and system prompt is similar enough.
+Only the outline step of deterministic (temperature 0) runs uses it (see
+`agent.agenerate_outline`); section prompts of one article are similar
+to each other and must not reuse each other's bodies.  Like the exact
+cache, entries expire after `LLM_CACHE_TTL` seconds so that refreshes
+eventually get a new outline.
+
+Embeddings are appended to a flat float16 file that is read back through
+`numpy.memmap`, so lookups are one matrix-vector product without loading
+the whole cache into memory.  Responses live in a small SQLite table
+whose `row` column is the embedding's row in that file:
+
+```
+CREATE TABLE entries (
+  row INTEGER PRIMARY KEY,  -- row in embeddings.f16
+  scope TEXT,               -- hash of model, system prompt and temperature
+  response TEXT,
+  ts INTEGER                -- unix time the entry was written
+);
+```
+
+The cache is opt-in: set `SEMCACHE=1` to enable it and `SEMCACHE_DIR`
+to relocate its files.
+"""
+
+from __future__ import annotations
+
+import functools
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from . import cache
+
+ENABLED = os.getenv("SEMCACHE") == "1"
+SEMCACHE_DIR = Path(os.getenv("SEMCACHE_DIR", Path(__file__).resolve().parent / "semcache"))
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_DIM = 1536
+# Minimum cosine similarity for a stored response to be reused.
+THRESHOLD = 0.92
+
+# Hit/miss counters for the current process.
+stats: Dict[str, int] = {"hits": 0, "misses": 0}
+
+_EMBEDDINGS_FILE = "embeddings.f16"
+# Serializes `add`, which derives the new row from the file size before
+# appending to it.
+_write_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=1)
+def _get_connection() -> sqlite3.Connection:
+    """Open the response table and create it on first use."""
+    SEMCACHE_DIR.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(SEMCACHE_DIR / "index.db", check_same_thread=False)
+    with conn:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                row INTEGER PRIMARY KEY,
+                scope TEXT,
+                response TEXT,
+                ts INTEGER
+            )
+            """
+        )
+        columns = {name for _, name, *_ in conn.execute("PRAGMA table_info(entries)")}
+        if "ts" not in columns:
+            # Entries written before expiry was tracked count as expired
+            conn.execute("ALTER TABLE entries ADD COLUMN ts INTEGER DEFAULT 0")
+        conn.execute("CREATE INDEX IF NOT EXISTS entries_scope_idx ON entries(scope)")
+    return conn
+
+
+async def aembed(client: Any, text: str) -> np.ndarray:
+    """Embed `text` and return it as a unit-length float32 vector.
+
+    Args:
+        client (openai.AsyncOpenAI): Client used for the embeddings request.
+        text (str): The text to embed.
+
+    Returns:
+        numpy.ndarray: The normalized embedding.
+    """
+    response = await client.embeddings.create(model=EMBEDDING_MODEL, input=text)
+    vector = np.asarray(response.data[0].embedding, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def lookup(scope: str, embedding: np.ndarray) -> Optional[str]:
+    """Return the response of the most similar cached prompt in `scope`.
+
+    Entries older than `cache.CACHE_TTL` seconds are ignored.
+
+    Args:
+        scope (str): Identifies the model and system prompt the response
+            was generated with; only entries with the same scope match.
+        embedding (numpy.ndarray): Normalized embedding of the user prompt.
+
+    Returns:
+        str | None: The cached response, or None if nothing is similar enough.
+    """
+    conn = _get_connection()
+    cutoff = time.time() - cache.CACHE_TTL if cache.CACHE_TTL else 0
+    rows = [row for (row,) in conn.execute(
+        "SELECT row FROM entries WHERE scope = ? AND ts >= ?", (scope, cutoff)
+    )]
+    path = SEMCACHE_DIR / _EMBEDDINGS_FILE
+    if not rows or not path.exists():
+        stats["misses"] += 1
+        return None
+    matrix = np.memmap(path, dtype=np.float16, mode="r").reshape(-1, EMBEDDING_DIM)
+    scores = matrix[rows].astype(np.float32) @ embedding
+    best = int(np.argmax(scores))
+    if scores[best] < THRESHOLD:
+        stats["misses"] += 1
+        return None
+    stats["hits"] += 1
+    return conn.execute("SELECT response FROM entries WHERE row = ?", (rows[best],)).fetchone()[0]
+
+
+def add(scope: str, embedding: np.ndarray, response: str) -> None:
+    """Store `response` under the prompt embedding `embedding`.
+
+    Args:
+        scope (str): Scope of the entry, as passed to `lookup`.
+        embedding (numpy.ndarray): Normalized embedding of the user prompt.
+        response (str): The model's response.
+    """
+    if embedding.shape != (EMBEDDING_DIM,):
+        raise ValueError(f"expected a {EMBEDDING_DIM}-dimensional embedding, got {embedding.shape}")
+    conn = _get_connection()
+    path = SEMCACHE_DIR / _EMBEDDINGS_FILE
+    row_bytes = EMBEDDING_DIM * np.dtype(np.float16).itemsize
+    with _write_lock:
+        row = path.stat().st_size // row_bytes if path.exists() else 0
+        with open(path, "ab") as f:
+            f.write(embedding.astype(np.float16).tobytes())
+        with conn:
+            conn.execute(
+                "INSERT INTO entries (row, scope, response, ts) VALUES (?, ?, ?, ?)",
+                (row, scope, response, int(time.time())),
+            )
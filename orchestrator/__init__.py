@@ -7,4 +7,14 @@ This package contains the database helpers, the command-line entry point and
  for details on how to use these modules.
 """
 
-from .db import init_db, niche_exists, insert_niche  # re-export for convenience
+# re-export for convenience
+from .db import (
+    init_db,
+    normalize_slug,
+    niche_exists,
+    niches_by_status,
+    insert_niche,
+    insert_niches,
+    upsert_niche,
+    try_claim_niche,
+)
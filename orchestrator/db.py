@@ -18,46 +18,103 @@ We store `keyword_seed` as a JSON‑encoded list of strings so that
 multiple seed keywords can be recorded per niche.  If you prefer to
 use PostgreSQL or another database engine, the same helper functions
 can be adapted accordingly.
+
+All helpers share a single connection opened in WAL mode, so repeated
+lookups and writes do not pay for reopening the database file.  Access
+to the connection is serialized with a lock, which makes the helpers
+safe to call from worker threads.
 """
 
 from __future__ import annotations
 
-import json
 import sqlite3
+import threading
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Iterable, Optional
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import orjson
 
 # Path to the SQLite database file.  It lives alongside this module.
 DB_PATH = Path(__file__).resolve().parent / "niches.db"
 
+_conn: Optional[sqlite3.Connection] = None
+_lock = threading.RLock()
+
 
 def get_connection() -> sqlite3.Connection:
-    """Create a connection to the SQLite database.
+    """Return the shared connection to the SQLite database.
+
+    The connection is opened on first use in autocommit mode with WAL
+    journaling and a busy timeout, then reused for the lifetime of the
+    process.  Callers must hold `_lock` while using it.
 
     Returns:
         sqlite3.Connection: A connection object.
     """
-    return sqlite3.connect(DB_PATH)
+    global _conn
+    with _lock:
+        if _conn is None:
+            conn = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            _conn = conn
+        return _conn
+
+
+@contextmanager
+def _transaction() -> Iterator[sqlite3.Connection]:
+    """Run the enclosed statements in a single write transaction.
+
+    Yields:
+        sqlite3.Connection: The shared connection, with the lock held.
+    """
+    with _lock:
+        conn = get_connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
 
 
 def init_db() -> None:
-    """Create the `niches` table if it does not already exist."""
-    conn = get_connection()
-    try:
-        with conn:
-            conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS niches (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    slug TEXT UNIQUE,
-                    keyword_seed TEXT,
-                    site_url TEXT,
-                    status TEXT
-                )
-                """
+    """Create the `niches` table and its indexes if they do not already exist."""
+    with _lock:
+        conn = get_connection()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS niches (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                slug TEXT UNIQUE,
+                keyword_seed TEXT,
+                site_url TEXT,
+                status TEXT
             )
-    finally:
-        conn.close()
+            """
+        )
+        # Supports status lookups such as finding niches due for a refresh
+        conn.execute("CREATE INDEX IF NOT EXISTS niches_status_idx ON niches(status)")
+
+
+def normalize_slug(slug: str) -> str:
+    """Return the canonical form of a slug.
+
+    The content agent writes each site to `sites/<slug>` using this form,
+    so slugs must be normalized before they are claimed; otherwise "Foo"
+    and "foo" would be two niches sharing one site directory.
+
+    Args:
+        slug (str): The slug as given by the user.
+
+    Returns:
+        str: The slug stripped of surrounding whitespace and lowercased.
+    """
+    return slug.strip().lower()
 
 
 def niche_exists(slug: str) -> bool:
@@ -69,12 +126,25 @@ def niche_exists(slug: str) -> bool:
     Returns:
         bool: True if the niche is present, False otherwise.
     """
-    conn = get_connection()
-    try:
-        cur = conn.execute("SELECT 1 FROM niches WHERE slug = ?", (slug,))
+    with _lock:
+        cur = get_connection().execute("SELECT 1 FROM niches WHERE slug = ? LIMIT 1", (slug,))
         return cur.fetchone() is not None
-    finally:
-        conn.close()
+
+
+def niches_by_status(status: str) -> List[str]:
+    """Return the slugs of all niches with the given status.
+
+    Args:
+        status (str): The status to filter on (e.g. 'refresh_due').
+
+    Returns:
+        list[str]: Matching slugs, in insertion order.
+    """
+    with _lock:
+        cur = get_connection().execute(
+            "SELECT slug FROM niches WHERE status = ? ORDER BY id", (status,)
+        )
+        return [row[0] for row in cur.fetchall()]
 
 
 def insert_niche(slug: str, keyword_seed: Iterable[str], site_url: Optional[str] = None,
@@ -87,15 +157,67 @@ def insert_niche(slug: str, keyword_seed: Iterable[str], site_url: Optional[str]
         site_url (Optional[str], optional): The URL where the site will be hosted.
         status (str, optional): Initial status for the niche. Defaults to "planned".
     """
-    conn = get_connection()
-    try:
-        with conn:
-            conn.execute(
-                "INSERT INTO niches (slug, keyword_seed, site_url, status) VALUES (?, ?, ?, ?)",
-                (slug, json.dumps(list(keyword_seed)), site_url, status),
-            )
-    finally:
-        conn.close()
+    with _lock:
+        get_connection().execute(
+            "INSERT INTO niches (slug, keyword_seed, site_url, status) VALUES (?, ?, ?, ?)",
+            (slug, orjson.dumps(list(keyword_seed)).decode(), site_url, status),
+        )
+
+
+def try_claim_niche(slug: str, keyword_seed: Iterable[str]) -> bool:
+    """Insert a niche as planned unless the slug is already taken.
+
+    The existence check and the insert are a single statement, so when
+    several workers race for the same slug exactly one of them wins.
+
+    Args:
+        slug (str): The unique slug for the niche.
+        keyword_seed (Iterable[str]): Seed keywords used to generate the site.
+
+    Returns:
+        bool: True if this call inserted the niche, False if it already existed.
+    """
+    with _lock:
+        cur = get_connection().execute(
+            "INSERT INTO niches (slug, keyword_seed, status) VALUES (?, ?, 'planned') "
+            "ON CONFLICT(slug) DO NOTHING RETURNING id",
+            (slug, orjson.dumps(list(keyword_seed)).decode()),
+        )
+        return cur.fetchone() is not None
+
+
+def insert_niches(rows: Iterable[Tuple[str, Iterable[str], Optional[str], str]]) -> None:
+    """Insert several niches in one transaction.
+
+    Args:
+        rows (Iterable[tuple]): `(slug, keyword_seed, site_url, status)`
+            tuples, with the same meaning as the arguments of `insert_niche`.
+    """
+    params = [
+        (slug, orjson.dumps(list(keyword_seed)).decode(), site_url, status)
+        for slug, keyword_seed, site_url, status in rows
+    ]
+    with _transaction() as conn:
+        conn.executemany(
+            "INSERT INTO niches (slug, keyword_seed, site_url, status) VALUES (?, ?, ?, ?)",
+            params,
+        )
+
+
+def upsert_niche(slug: str, keyword_seed: Iterable[str], status: str) -> None:
+    """Insert a niche, or set its status if the slug is already present.
+
+    Args:
+        slug (str): The unique slug for the niche.
+        keyword_seed (Iterable[str]): Seed keywords, used only when inserting.
+        status (str): The status to record.
+    """
+    with _transaction() as conn:
+        conn.execute(
+            "INSERT INTO niches (slug, keyword_seed, status) VALUES (?, ?, ?) "
+            "ON CONFLICT(slug) DO UPDATE SET status = excluded.status",
+            (slug, orjson.dumps(list(keyword_seed)).decode(), status),
+        )
 
 
 def update_niche_status(slug: str, status: str) -> None:
@@ -105,9 +227,5 @@ def update_niche_status(slug: str, status: str) -> None:
         slug (str): The slug identifying the niche.
         status (str): The new status (e.g. 'published', 'refresh_due').
     """
-    conn = get_connection()
-    try:
-        with conn:
-            conn.execute("UPDATE niches SET status = ? WHERE slug = ?", (status, slug))
-    finally:
-        conn.close()
\ No newline at end of file
+    with _lock:
+        get_connection().execute("UPDATE niches SET status = ? WHERE slug = ?", (status, slug))
\ No newline at end of file
@@ -4,58 +4,251 @@ This script ties together the database and the content agent.  It reads
 command‑line arguments for the niche slug and one or more seed keywords,
 checks whether the niche already exists, and if not, inserts it into
 the database and triggers the agent to generate the site.  If the
-niche already exists, it prints a message and exits.  In future
-versions this module could also handle refresh scheduling and metrics
-collection.
+niche already exists, it prints a message and exits.  Several niches
+can be generated in one run by passing a JSON manifest instead; they are
+generated concurrently and share the same LLM concurrency limit.  In
+future versions this module could also handle refresh scheduling and
+metrics collection.
 """
 
 from __future__ import annotations
 
 import argparse
+import asyncio
+import json
 import sys
+from typing import Callable
 
-from .db import init_db, niche_exists, insert_niche, update_niche_status
-from content_agent.agent import generate_niche_site
+from .db import init_db, normalize_slug, try_claim_niche, upsert_niche
+
+# The content agent is imported lazily, only once there is a niche to
+# generate: importing it pulls in the OpenAI SDK, which is slow enough to
+# dominate runs that merely find every niche already exists.
+
+def _positive_int(value: str) -> int:
+    """argparse type for options that must be a positive integer."""
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"expected a positive integer, got {value!r}")
+    return number
+
+
+# Built once at import so repeated invocations from the same process do
+# not pay for constructing it again.
+parser = argparse.ArgumentParser(
+    description="Generate a new affiliate site for a given niche."
+)
+parser.add_argument(
+    "slug",
+    nargs="?",
+    help="The URL‑friendly slug for the niche (e.g. 'pickleball-shoes').",
+)
+parser.add_argument(
+    "keywords",
+    nargs="*",
+    help="One or more seed keywords to guide content generation.",
+)
+parser.add_argument(
+    "--manifest",
+    help="Path to a JSON file listing several niches as "
+         "[{\"slug\": ..., \"keywords\": [...]}, ...] to generate concurrently.",
+)
+parser.add_argument(
+    "--concurrency",
+    type=_positive_int,
+    default=None,
+    help="Maximum number of concurrent LLM requests "
+         "(defaults to $LLM_MAX_CONCURRENCY or 8).",
+)
+parser.add_argument(
+    "--deterministic",
+    action="store_true",
+    help="Generate with temperature 0, so re-running an unchanged niche "
+         "is answered from the response cache instead of the API.",
+)
+parser.add_argument(
+    "--progress",
+    action="store_true",
+    help="Stream section replies and show how much text has been "
+         "generated so far on stderr.",
+)
+parser.add_argument(
+    "--batch",
+    action="store_true",
+    help="Generate through the OpenAI Batch API (half price, but may "
+         "take up to 24 hours per round).",
+)
 
 
 def main(argv: list[str] | None = None) -> None:
-    """Parse arguments and generate a niche if it does not exist."""
-    parser = argparse.ArgumentParser(
-        description="Generate a new affiliate site for a given niche."
-    )
-    parser.add_argument(
-        "slug",
-        help="The URL‑friendly slug for the niche (e.g. 'pickleball-shoes').",
-    )
-    parser.add_argument(
-        "keywords",
-        nargs="+",
-        help="One or more seed keywords to guide content generation.",
-    )
+    """Parse arguments and generate the requested niches that do not exist."""
     args = parser.parse_args(argv)
 
+    if args.manifest:
+        if args.slug:
+            parser.error("pass either a slug and keywords or --manifest, not both")
+        with open(args.manifest, "r", encoding="utf-8") as f:
+            items = json.load(f)
+        niches = []
+        for i, item in enumerate(items):
+            try:
+                niches.append((item["slug"], item["keywords"]))
+            except (KeyError, TypeError):
+                parser.error(f"manifest entry {i} must be an object with 'slug' and 'keywords'")
+    elif args.slug and args.keywords:
+        niches = [(args.slug, args.keywords)]
+    else:
+        parser.error("a slug and at least one keyword are required unless --manifest is given")
+
+    if args.batch and args.concurrency is not None:
+        parser.error("--concurrency only applies to real-time generation, not --batch")
+    if args.batch and args.progress:
+        parser.error("--progress only applies to real-time generation, not --batch")
+
+    if args.batch:
+        # Batch runs are non-interactive; let stdout buffer in blocks
+        sys.stdout.reconfigure(line_buffering=False)
+
+    temperature = 0.0 if args.deterministic else None
+    if not main_many(niches, batch=args.batch, concurrency=args.concurrency,
+                     temperature=temperature, progress=args.progress):
+        sys.exit(1)
+
+
+def main_many(slugs_and_keywords: list[tuple[str, list[str]]], batch: bool = False,
+              concurrency: int | None = None, temperature: float | None = None,
+              progress: bool = False) -> bool:
+    """Generate every niche in the list that does not exist yet.
+
+    Slugs are normalized with `normalize_slug`, then each new niche is
+    claimed atomically as planned, and all claimed niches are generated
+    concurrently and marked published or error.
+
+    Args:
+        slugs_and_keywords (list[tuple[str, list[str]]]): `(slug, keywords)` pairs.
+        batch (bool, optional): Use the OpenAI Batch API instead of
+            real-time requests. Defaults to False.
+        concurrency (int | None, optional): Maximum number of concurrent
+            LLM requests; None keeps the agent's default.
+        temperature (float | None, optional): Sampling temperature for
+            every LLM request; 0 makes responses cacheable.  None uses the
+            API's default.
+        progress (bool, optional): Stream section replies and report the
+            number of characters generated so far on stderr.  Ignored
+            with `batch`.  Defaults to False.
+
+    Returns:
+        bool: True if every new niche was generated successfully.
+
+    Raises:
+        ValueError: If `concurrency` is less than 1.  This is checked
+            before any niche is claimed.
+    """
+    if concurrency is not None and concurrency < 1:
+        raise ValueError("concurrency limit must be at least 1")
+
     # Initialize the database table if it doesn't already exist
     init_db()
 
-    if niche_exists(args.slug):
-        print(f"Niche '{args.slug}' already exists. Skipping generation.")
-        return
+    pending: list[tuple[str, list[str]]] = []
+    for slug, keywords in slugs_and_keywords:
+        # Claim the slug in the form the agent uses for the site directory
+        slug = normalize_slug(slug)
+        if not try_claim_niche(slug, keywords):
+            print(f"Niche '{slug}' already exists. Skipping generation.")
+            continue
+        print(f"Creating niche '{slug}' with keywords: {keywords}")
+        pending.append((slug, list(keywords)))
+    if not pending:
+        return True
+
+    if batch:
+        return _generate_batch(pending, temperature)
+    try:
+        from content_agent.agent import set_max_concurrency
+        if concurrency is not None:
+            set_max_concurrency(concurrency)
+    except Exception as exc:
+        # The niches are already claimed; record them as errors so they
+        # are not skipped as existing on the next run
+        print(f"Error starting generation: {exc}")
+        for slug, keywords in pending:
+            upsert_niche(slug, keywords, "error")
+        return False
+    on_chunk = _ProgressLine().update if progress else None
+    try:
+        return all(asyncio.run(_generate_many(pending, temperature, on_chunk)))
+    finally:
+        if on_chunk is not None:
+            print(file=sys.stderr)
 
-    print(f"Creating niche '{args.slug}' with keywords: {args.keywords}")
-    insert_niche(args.slug, args.keywords)
 
-    # Generate the site via the content agent
+async def _generate_many(niches: list[tuple[str, list[str]]],
+                         temperature: float | None = None,
+                         on_chunk: Callable[[str], None] | None = None) -> list[bool]:
+    """Generate niches concurrently; one niche failing does not cancel the others."""
+    from content_agent.agent import aclose_client
+
     try:
-        generate_niche_site(args.slug, args.keywords)
-        # Mark as published after successful generation
-        update_niche_status(args.slug, "published")
+        async with asyncio.TaskGroup() as tg:
+            tasks = [tg.create_task(_generate_one(slug, keywords, temperature, on_chunk))
+                     for slug, keywords in niches]
+    finally:
+        # The client's connections belong to this event loop
+        await aclose_client()
+    return [task.result() for task in tasks]
+
+
+async def _generate_one(slug: str, keywords: list[str], temperature: float | None = None,
+                        on_chunk: Callable[[str], None] | None = None) -> bool:
+    """Generate a single niche via the content agent and record its status."""
+    from content_agent.agent import generate_niche_site
+
+    try:
+        await generate_niche_site(slug, keywords, temperature, on_chunk)
     except Exception as exc:
-        # In a real implementation you'd log this exception and update
-        # status accordingly; for now just print and exit non‑zero.
-        update_niche_status(args.slug, "error")
-        print(f"Error generating niche '{args.slug}': {exc}")
-        sys.exit(1)
+        # In a real implementation you'd log this exception; for now just
+        # print it and let the caller exit non‑zero.
+        upsert_niche(slug, keywords, "error")
+        print(f"Error generating niche '{slug}': {exc}")
+        return False
+    # Mark as published after successful generation
+    upsert_niche(slug, keywords, "published")
+    return True
+
+
+class _ProgressLine:
+    """Single stderr status line counting the characters generated so far."""
+
+    def __init__(self) -> None:
+        self.received = 0
+
+    def update(self, fragment: str) -> None:
+        self.received += len(fragment)
+        print(f"\r{self.received:,} characters generated", end="", file=sys.stderr, flush=True)
+
+
+def _generate_batch(niches: list[tuple[str, list[str]]], temperature: float | None = None) -> bool:
+    """Generate niches through the Batch API and record their status."""
+    try:
+        from content_agent.batch import generate_niche_sites_batch
+        written = set(generate_niche_sites_batch(niches, temperature=temperature))
+    except Exception as exc:
+        print(f"Error running batch job: {exc}")
+        written = set()
+    ok = True
+    for slug, keywords in niches:
+        if slug in written:
+            upsert_niche(slug, keywords, "published")
+        else:
+            upsert_niche(slug, keywords, "error")
+            print(f"Error generating niche '{slug}': no result from batch job")
+            ok = False
+    return ok
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
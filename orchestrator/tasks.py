@@ -6,35 +6,70 @@ workflow engine such as [Celery](https://docs.celeryq.dev/),
 [Temporal](https://temporal.io/) or [Airflow](https://airflow.apache.org/).
 This module provides stubs for such tasks.  If Celery is installed and
 configured, the `@app.task` decorator can be uncommented to make
-`generate_niche_task` run asynchronously.
+`generate_niche_task` run asynchronously.  `generate_niches_batch` is
+intended for scheduled bulk runs: it routes generation through the
+OpenAI Batch API, which is cheaper but may take hours to complete.
 """
 
 from __future__ import annotations
 
+import asyncio
+
 # Example Celery configuration (commented out by default)
 # from celery import Celery
 # app = Celery('findmethedeal', broker='redis://localhost:6379/0')
 
-from orchestrator.db import insert_niche, niche_exists, update_niche_status
-from content_agent.agent import generate_niche_site
+from orchestrator.db import normalize_slug, try_claim_niche, upsert_niche
+from content_agent.agent import aclose_client, generate_niche_site
+from content_agent.batch import generate_niche_sites_batch
 
 
-def generate_niche_task(slug: str, keywords: list[str]) -> None:
+def generate_niche_task(slug: str, keywords: list[str], temperature: float | None = None) -> None:
     """Wrapper task to generate a niche asynchronously.
 
     This function inserts the niche into the database (if necessary) and
     calls the content agent.  Hook it into your workflow engine of
     choice to run generation jobs on a schedule or in response to
-    user input.
+    user input.  Pass `temperature=0` for deterministic, cacheable output.
+    """
+    slug = normalize_slug(slug)
+    if not try_claim_niche(slug, keywords):
+        return
+    try:
+        asyncio.run(_generate(slug, keywords, temperature))
+        upsert_niche(slug, keywords, "published")
+    except Exception:
+        upsert_niche(slug, keywords, "error")
+
+
+async def _generate(slug: str, keywords: list[str], temperature: float | None) -> None:
+    """Generate a niche, closing the loop's OpenAI client afterwards."""
+    try:
+        await generate_niche_site(slug, keywords, temperature)
+    finally:
+        await aclose_client()
+
+
+def generate_niches_batch(slugs_keywords: list[tuple[str, list[str]]],
+                          temperature: float | None = None) -> None:
+    """Generate several niches at once through the OpenAI Batch API.
+
+    Niches that already exist are skipped.  The remaining ones are
+    claimed as planned, generated together and then marked as published
+    or error individually.
     """
-    if niche_exists(slug):
+    pending = [(normalize_slug(slug), keywords) for slug, keywords in slugs_keywords]
+    pending = [(slug, keywords) for slug, keywords in pending
+               if try_claim_niche(slug, keywords)]
+    if not pending:
         return
-    insert_niche(slug, keywords)
     try:
-        generate_niche_site(slug, keywords)
-        update_niche_status(slug, "published")
+        written = set(generate_niche_sites_batch(pending, temperature=temperature))
     except Exception:
-        update_niche_status(slug, "error")
+        written = set()
+    for slug, keywords in pending:
+        status = "published" if slug in written else "error"
+        upsert_niche(slug, keywords, status)
 
 
-__all__ = ["generate_niche_task"]
\ No newline at end of file
+__all__ = ["generate_niche_task", "generate_niches_batch"]
\ No newline at end of file